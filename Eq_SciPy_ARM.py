@@ -1,331 +1,552 @@
-"""
-Filename: Eq_SciPy_ARM.py
-Author:   Danny Soppit
-Description: This module provides filter coefficients for an audio
-             equalizer. Various components of the filter can be changed.
-
-"""
-
-# ~~~~~~~~~~ Python Libraries ~~~~~~~~~~~~~
-
-import cmsisdsp as dsp
-import numpy as np
-import librosa
-import soundfile as sf
-import matplotlib.pyplot as plt
-from pylab import figure, plot, show
-from scipy.signal import butter, sosfreqz, freqz, tf2zpk, zpk2sos, sosfilt
-from matplotlib.ticker import ScalarFormatter
-
-# ~~~~~~~~~~ Define Parameters ~~~~~~~~~~~~~
-
-BASE_FREQUENCY      = 100         # Octave freq at which the first band center is started
-NUM_BANDS           = 6           # Number of passband filters, you will see NUM_BANDS+1 a lot in the code as the first band has 0 as an edge frequency and is omitted
-FS                  = 16000       # Hz sampling rate
-
-SIG_BASE_FREQUENCY  = 80          # Main frequency for the generated input signal
-SIG_NOISE_FREQUENCY = 2000        # Noise frequency for the generated input signal
-
-POSTSHIFT           = 4           # Scales the input signal by 4^2 before processesing
-NUMSTAGES           = 3           # Number of cascaded biquad filters applied to each band / Butterworth bandpass SOS order
-
-GENERATE_SIGNAL     = True        # False for wav input, True for generated signal
-LOG_SCALE_PLOT      = True        # True for a log plot of the filter freq resp, linear elsewise
-
-FIG_WIDTH           = 12          # Width in inches
-FIG_HEIGHT          = 6           # Height in inches
- 
-INPUT_FILENAME      = "input_file.wav"
-SCIPY_OUT_FILENAME  = "SciPy-output_file.wav"
-ARM_OUT_FILENAME    = "ARM-output_file.wav"
-
-# ~~~~~~~~~~ Class Definitions ~~~~~~~~~~~~~
-
-class SignalProcessor:
-    def __init__(self):
-        self.fs = FS
-        self.base_frequency = BASE_FREQUENCY
-        self.num_bands = NUM_BANDS + 1
-        self.input_signal = None
-        self.sos_list = []
-        self.frequencies = []
-        self.edges = []
-        self.coefs = []
-        
-        return
-        
-    def generate_input_signal(self):  
-    
-        # Create a signal by having a base sinewave with additional noise superimposed upon it
-        t = np.arange(0, 0.5, 1/self.fs) 
-        freq = SIG_BASE_FREQUENCY  
-        sine_wave = np.sin(2 * np.pi * freq * t)
-        noise_frequency = SIG_NOISE_FREQUENCY  
-        noise = 0.25 * np.sin(2 * np.pi * SIG_NOISE_FREQUENCY * t)
-        self.input_signal = sine_wave + noise
-        
-        # Plot input signal
-        plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
-        
-        plt.subplot(2, 1, 1) 
-        plt.plot(t, self.input_signal, label='Generated Noise Signal')
-        plt.title('Original Signal: Time Domain')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Amplitude')
-        plt.legend()
-        
-        plt.subplot(2, 1, 2)
-        plt.magnitude_spectrum(self.input_signal, Fs=self.fs, scale='dB')
-        plt.title('Original Signal: Frequency Domain')
-        plt.xlabel('Frequency (Hz)')
-        plt.ylabel('Magnitude (dB)')
-        
-        plt.tight_layout()
-        
-        return
-
-    def load_input_signal(self, filename=INPUT_FILENAME):
-    
-        # Obtain the input signal
-        input_filename = filename
-        self.input_signal, fs = librosa.load(input_filename, sr=None)
-        fs = self.fs
-
-        # Plot input signal
-        plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
-        
-        plt.subplot(2, 1, 1)
-        plt.plot(np.arange(len(self.input_signal)) / fs, self.input_signal, label='Your Input Signal')
-        plt.title('Input Signal: Time Domain')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Amplitude')
-        plt.legend()
-        
-        plt.subplot(2, 1, 2)
-        plt.magnitude_spectrum(self.input_signal, Fs=fs, scale='dB')
-        plt.title('Input Signal: Frequency Domain')
-        plt.xlabel('Frequency (Hz)')
-        plt.ylabel('Magnitude (dB)')
-        
-        plt.tight_layout()
-        
-        return
-        
-    def calculate_centers(self, base_frequency, num_bands):
-    
-        # Calculate the frequencies and frequency edges based upon the octave frequency and number of bands desired
-        frequencies = [base_frequency * 2**i for i in range(-1, num_bands)]
-        edges = [0] * (len(frequencies) - 1)
-
-        for i in range(len(frequencies)-1):
-            edges[i] = 10**(np.log10(frequencies[i]) + ((np.log10(frequencies[i+1]) - np.log10(frequencies[i])) / 2))
-    
-        # Print out the obtained frequency bands
-        print(f"\nOctaves [Hz]\t\tEdge Frequencies [Hz]\n")
-        for i, (freq, edge) in enumerate(zip(frequencies, edges)):
-            if i == 0:
-                print(f"Omitted band\n{freq:8.2f} [Hz]\t\t0\tand {edge:8.2f} [Hz]\n")
-                print(f"Bands used:")
-            else:
-                print(f"{freq:8.2f} [Hz]\t\t{edges[i-1]:.2f}\tand {edge:8.2f} [Hz]")
-        print(f"\n")
-        
-        self.frequencies = frequencies
-        self.edges = edges  
-        
-        return frequencies, edges
-        
-    def plot_bandpass_filter_response(self, scale='linear'):
-        plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
-      
-        # Obtain the freq, resp, and sos from the Butterworth bandpass filter
-        for i in range(0, NUM_BANDS):
-            lowcut = self.edges[i]
-            highcut = self.edges[i + 1]
-
-            freq, resp, sos = self.butter_bandpass(lowcut, highcut, self.fs, i, order=NUMSTAGES)
-            self.sos_list.append(sos)
-            
-            # Scale the coefficients by the poststage factor and format to Q31
-            coefs=np.reshape(np.hstack((sos[:,:3],-sos[:,4:])), 15)
-            coefs = coefs / (POSTSHIFT ** 2)
-            coefsQ31 = (coefs * (2**31)) 
-            coefsQ31= np.round(coefsQ31)
-            
-            print("")
-            print("~~~~~~~~~~ Scaled Q31 Biquad Coefficient bands: {:.1f} Hz to {:.1f} Hz: ~~~~~~~~~~ \n".format(lowcut, highcut))
-            print(" ".join("{:.2f}".format(x) for x in coefsQ31))
-            print("\n\n")
-             
-            plt.plot(freq, np.abs(resp))
-            plt.title('Magnitude Response of Butterworth Bandpass Filter')
-            plt.xlabel('Frequency (Hz)')
-            plt.ylabel('Magnitude')
-
-        # Plot the signal in log if desired
-        if LOG_SCALE_PLOT:
-            plt.semilogx(self.frequencies, np.ones_like(self.frequencies), 'o', label='Centres of the bandpass filters')
-            plt.semilogx(self.edges, np.ones_like(self.edges) * 1, '*', label='Edges of the bandpass filters')
-            plt.title('Logarithmic Scale Plot of Frequencies')
-            plt.gca().xaxis.set_major_formatter(ScalarFormatter())
-            plt.legend()
-            plt.grid(True)
-   
-        return
-            
-    def butter_bandpass(self, lowcut, highcut, fs, i, order): 
-    
-        # Calculate nyquist freq and the upper bounds of the bandpass filter
-        nyquist = 0.5 * fs
-        low = lowcut / nyquist
-        high = highcut / nyquist
-        
-        # Obtain the a & b coefficients for each filter 
-        # 5 coefficients for each filter * number of stages/order
-        b, a = butter(order, [low, high], btype='band', analog=False)
-        
-        # Computes the frequency response of a digital filter
-        frequencies, response = freqz(b, a, fs=fs)
-        
-        # Obtain the zero, pole, and gain representation of a digital filter
-        z, p, k = tf2zpk(b, a)
-        
-        # Return the second-order sections from zeros, poles, and gain of a system
-        sos = zpk2sos(z, p, k)
-     
-        return frequencies, response, sos   
-        
-    def apply_filters_and_print_python(self):
-    
-        # Filter the signal using a digital IIR filter defined by sos.
-        signal_list = [sosfilt(sos, self.input_signal) for sos in self.sos_list]
-
-        # Scale the bands here, for example the first band scaled by a factor of 1.
-        # This is where the "equalization" portion would be applied to tune the bands
-        signal_list[0] *= 1
-        
-        # Sum up the signals to reconstruct the signal
-        final_signal = np.sum(signal_list, axis=0)
-
-        # Output the signal to a wav file
-        output_filename = "filtered_output.wav"
-        sf.write(output_filename, final_signal, self.fs)
-
-        # Plot resulting signal
-        plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
-        
-        plt.subplot(2, 1, 1)
-        plt.plot(np.arange(len(final_signal)) / self.fs, final_signal, label='SciPy Filtered Signal')
-        plt.title('Python SciPy: Time Domain for the Filtered Signal')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Amplitude')
-        plt.legend()
-        
-        plt.subplot(2, 1, 2)
-        plt.magnitude_spectrum(final_signal, Fs=self.fs, scale='dB')
-        plt.title('Python SciPy: Frequency Domain for the Filtered Signal')
-        plt.xlabel('Frequency (Hz)')
-        plt.ylabel('Magnitude (dB)')
-        
-        plt.tight_layout()
-        
-        output_filename = SCIPY_OUT_FILENAME    
-        sf.write(output_filename, final_signal, self.fs)
-        
-        return
-        
-    def apply_filters_and_print_ARM(self):
-    
-        # Local variables
-        signal_ARM = []
-        
-         # Loop over the number of number of frequency bands
-        for i in range(0, NUM_BANDS):
-            sos = self.sos_list[i]
-            
-            # Reshape the sos and scale the coefficents down based off of the postshift
-            coefs=np.reshape(np.hstack((sos[:,:3],-sos[:,4:])), NUMSTAGES * 5)
-            coefs = coefs / (POSTSHIFT ** 2)
-            
-            # Convert the coefficients to Q31 
-            coefsQ31 = (coefs * (2**31)) 
-            coefsQ31= np.round(coefsQ31)
-            self.coefs = coefsQ31
-        
-            # Initialize the biquad filter and apply the filter
-            state = np.zeros(NUMSTAGES * 4)
-            biquadQ31 = dsp.arm_biquad_casd_df1_inst_q31()
-            dsp.arm_biquad_cascade_df1_init_q31(biquadQ31, NUMSTAGES, self.coefs, state, POSTSHIFT)
-
-            # Convert the signal to Q31 and scale it down for filtering
-            sigQ31 = self.input_signal * (2**31)
-            sigQ31 = sigQ31 / 4
-
-            # Apply the filter
-            res2 = dsp.arm_biquad_cascade_df1_q31(biquadQ31, sigQ31) 
-
-            # Scale the signal back up and reconvert it back
-            res2 *= 4
-            res2 = res2 / (2**31)
-
-            # Append this new signal to an array
-            signal_ARM.append(res2)
-
-        # Scale the bands here, for example the first band scaled by a factor of 1.
-        # This is where the "equalization" portion would be applied to tune the bands
-        signal_ARM[0] *= 1 
-        
-        # Sum up all the signals together to reconstruction the original signal
-        final_signal_ARM = np.sum(signal_ARM, axis=0)
-
-        # Output the file name
-        output_filename = ARM_OUT_FILENAME
-        sf.write(output_filename, final_signal_ARM, self.fs)
-
-        # Plot resulting signal
-        plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
-        
-        plt.subplot(2, 1, 1)
-        plt.plot(np.arange(len(final_signal_ARM)) / self.fs, final_signal_ARM, label='ARM Filtered Signal')
-        plt.title('ARM: Time Domain for the Filtered Signal')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Amplitude')
-        plt.legend()
-        
-        plt.subplot(2, 1, 2)
-        plt.magnitude_spectrum(final_signal_ARM, Fs=self.fs, scale='dB')
-        plt.title('ARM: Frequency Domain for the Filtered Signal')
-        plt.xlabel('Frequency (Hz)')
-        plt.ylabel('Magnitude (dB)')
-        
-        plt.tight_layout()
-        
-        return
-        
-if __name__ == "__main__":
-
-    # ~~~~~~~~~~ Signal Generation ~~~~~~~~~~~~~
-
-    if GENERATE_SIGNAL:
-        processor = SignalProcessor()
-        processor.generate_input_signal()
-    else:
-        processor = SignalProcessor()
-        processor.load_input_signal(filename=INPUT_FILENAME)   
-       
-    # ~~~~~~~~~~ Filter Generation ~~~~~~~~~~~~~
-
-    processor.calculate_centers(BASE_FREQUENCY, NUM_BANDS+1)
-    processor.plot_bandpass_filter_response()
-       
-    # ~~~~~~~ Python Filter Application ~~~~~~~~
-
-    processor.apply_filters_and_print_python()
-
-    # ~~~~~~~~~ ARM Filter Application ~~~~~~~~~
-
-    processor.apply_filters_and_print_ARM()
-
-    # ~~~~~~~~~~~~ Show the plots ~~~~~~~~~~~~~~
-
-    plt.show()
+"""
+Filename: Eq_SciPy_ARM.py
+Author:   Danny Soppit
+Description: This module provides filter coefficients for an audio
+             equalizer. Various components of the filter can be changed.
+
+"""
+
+# ~~~~~~~~~~ Python Libraries ~~~~~~~~~~~~~
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cmsisdsp as dsp
+import numpy as np
+import librosa
+import soundfile as sf
+import matplotlib
+import matplotlib.pyplot as plt
+from pylab import figure, plot, show
+from scipy.fft import rfft, rfftfreq
+from scipy.signal import butter, sosfreqz, sosfilt
+from matplotlib.ticker import ScalarFormatter
+
+# Numba is optional; without it the SciPy sosfilt path is used instead
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# CuPy/cusignal are optional; when present, long signals are filtered on the GPU
+try:
+    import cupy as cp
+    import cusignal
+    HAVE_CUSIGNAL = True
+except ImportError:
+    HAVE_CUSIGNAL = False
+
+# ~~~~~~~~~~ Define Parameters ~~~~~~~~~~~~~
+
+BASE_FREQUENCY      = 100         # Octave freq at which the first band center is started
+NUM_BANDS           = 6           # Number of passband filters, you will see NUM_BANDS+1 a lot in the code as the first band has 0 as an edge frequency and is omitted
+FS                  = 16000       # Hz sampling rate
+
+SIG_BASE_FREQUENCY  = 80          # Main frequency for the generated input signal
+SIG_NOISE_FREQUENCY = 2000        # Noise frequency for the generated input signal
+
+POSTSHIFT           = 4           # Scales the input signal by 4^2 before processesing
+NUMSTAGES           = 3           # Number of cascaded biquad filters applied to each band / Butterworth bandpass SOS order
+
+ARM_KERNEL          = "q31"       # "q31" or "q15" for the fixed-point CMSIS kernels, "f32" for the float DF1 kernel (faster on NEON builds, no quantization)
+
+GPU_MIN_SAMPLES     = 100000      # Signals shorter than this stay on the CPU, where kernel-launch latency would dominate
+
+BLOCK_SIZE          = 1024        # Samples per streaming block; sized so one hot block fits in L1 across all band passes
+
+GENERATE_SIGNAL     = True        # False for wav input, True for generated signal
+LOG_SCALE_PLOT      = True        # True for a log plot of the filter freq resp, linear elsewise
+PLOT                = True        # False skips all figure construction and the GUI event loop
+
+FIG_WIDTH           = 12          # Width in inches
+FIG_HEIGHT          = 6           # Height in inches
+ 
+Q31_COEF_SCALE      = (1 << 31) / (POSTSHIFT ** 2)   # Postshift scaling and Q31 conversion fused into one factor
+Q31_SIG_SCALE       = (1 << 31) / 4                  # Q31 conversion and the /4 headroom scaling fused into one factor
+Q15_COEF_SCALE      = (1 << 15) / (POSTSHIFT ** 2)   # Same fused factors for the 16-bit Q15 kernel
+Q15_SIG_SCALE       = (1 << 15) / 4
+
+INPUT_FILENAME      = "input_file.wav"
+SCIPY_OUT_FILENAME  = "SciPy-output_file.wav"
+ARM_OUT_FILENAME    = "ARM-output_file.wav"
+
+# With plotting disabled there is no reason to initialize a GUI backend; with
+# it enabled, line simplification speeds up the dense time-domain plots
+if PLOT:
+    plt.rcParams['path.simplify'] = True
+    plt.rcParams['path.simplify_threshold'] = 1.0
+else:
+    matplotlib.use('Agg')
+
+# ~~~~~~~~~~ Plot Helpers ~~~~~~~~~~~~~~~~~~
+
+def _mag_db(x, fs):
+
+    # One explicit rfft per spectrum plot, parallelized across cores,
+    # instead of matplotlib recomputing an FFT inside magnitude_spectrum.
+    # Returns the one-sided frequency axis and the magnitude in dB
+    spectrum = rfft(x, workers=-1)
+    freqs = rfftfreq(len(x), 1 / fs)
+
+    return freqs, 20 * np.log10(np.abs(spectrum) + 1e-20)
+
+# ~~~~~~~~~~ Filter Design ~~~~~~~~~~~~~~~~~
+
+@lru_cache(maxsize=128)
+def _design_bandpass(lowcut, highcut, fs, order):
+
+    # Pure function of the band parameters, so repeated runs with the same
+    # band layout reuse the cached design instead of re-running SciPy's
+    # design path. Callers must not modify the returned array.
+    # Only the second-order sections are produced here; the frequency
+    # response is analysis, not design, and is evaluated lazily by the
+    # plot path so the ARM route never pays for it.
+
+    # Calculate nyquist freq and the upper bounds of the bandpass filter
+    nyquist = 0.5 * fs
+    low = lowcut / nyquist
+    high = highcut / nyquist
+
+    # Obtain the second-order sections directly; butter computes the zpk
+    # form internally, so this skips the ill-conditioned b,a polynomial
+    # representation and the tf2zpk/zpk2sos round-trip entirely
+    return butter(order, [low, high], btype='band', analog=False, output='sos')
+
+# ~~~~~~~~~~ Numba Filter Kernel ~~~~~~~~~~~
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def sos_cascade(x, sos_all, gains):
+        # Run every band's biquad cascade over the signal and sum the gained
+        # band outputs. The bands are independent recursions, so they run on
+        # separate cores via prange; only the final reduction touches all
+        # rows. sos_all has shape (num_bands, num_stages, 6) and the stages
+        # use the direct-form-II transposed update.
+        num_bands = sos_all.shape[0]
+        num_stages = sos_all.shape[1]
+        bands = np.empty((num_bands, len(x)), dtype=x.dtype)
+        for b in prange(num_bands):
+            z = np.zeros((num_stages, 2), dtype=x.dtype)
+            for n in range(len(x)):
+                v = x[n]
+                for s in range(num_stages):
+                    y = sos_all[b, s, 0] * v + z[s, 0]
+                    z[s, 0] = sos_all[b, s, 1] * v - sos_all[b, s, 4] * y + z[s, 1]
+                    z[s, 1] = sos_all[b, s, 2] * v - sos_all[b, s, 5] * y
+                    v = y
+                bands[b, n] = v * gains[b]
+        out = np.zeros(len(x), dtype=x.dtype)
+        for b in range(num_bands):
+            for n in range(len(x)):
+                out[n] += bands[b, n]
+        return out
+
+    # Compile once at import time so the first real run does not pay the
+    # JIT cost; cache=True keeps the compiled kernel across sessions
+    sos_cascade(np.zeros(4, dtype=np.float32), np.zeros((1, 1, 6), dtype=np.float32),
+                np.ones(1, dtype=np.float32))
+
+# ~~~~~~~~~~ Class Definitions ~~~~~~~~~~~~~
+
+class SignalProcessor:
+    def __init__(self):
+        self.fs = FS
+        self.base_frequency = BASE_FREQUENCY
+        self.num_bands = NUM_BANDS + 1
+        self.input_signal = None
+        self.sos_list = []
+        self.sos32_list = []
+        self.zi_list = []
+        self.frequencies = []
+        self.edges = []
+
+        # Scratch buffer for the per-band (b0, b1, b2, -a1, -a2) CMSIS
+        # coefficient layout, reused across bands and calls
+        self._coefs_buf = np.empty((NUMSTAGES, 5))
+
+        # Wav encoding releases the GIL inside libsndfile, so the output
+        # writes overlap with plotting on a small worker pool; the futures
+        # are kept so the main block can drain them and surface any write
+        # error before exiting
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._io_futures = []
+
+        return
+        
+    def generate_input_signal(self):  
+    
+        # Create a signal by having a base sinewave with additional noise superimposed upon it.
+        # The 2*pi*t phase ramp is computed once and shared by both tones.
+        # float32 is plenty for audio and halves the bandwidth downstream
+        t = np.arange(0, 0.5, 1/self.fs, dtype=np.float32)
+        phase = 2 * np.pi * t
+        self.input_signal = np.sin(SIG_BASE_FREQUENCY * phase) + 0.25 * np.sin(SIG_NOISE_FREQUENCY * phase)
+        
+        # Plot input signal
+        if PLOT:
+            plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
+        
+            plt.subplot(2, 1, 1) 
+            plt.plot(t, self.input_signal, label='Generated Noise Signal')
+            plt.title('Original Signal: Time Domain')
+            plt.xlabel('Time (s)')
+            plt.ylabel('Amplitude')
+            plt.legend()
+        
+            plt.subplot(2, 1, 2)
+            freqs, mags = _mag_db(self.input_signal, self.fs)
+            plt.plot(freqs, mags)
+            plt.title('Original Signal: Frequency Domain')
+            plt.xlabel('Frequency (Hz)')
+            plt.ylabel('Magnitude (dB)')
+        
+            plt.tight_layout()
+        
+        return
+
+    def load_input_signal(self, filename=INPUT_FILENAME):
+    
+        # Obtain the input signal
+        input_filename = filename
+        self.input_signal, fs = librosa.load(input_filename, sr=None)
+        fs = self.fs
+
+        # Plot input signal
+        if PLOT:
+            plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
+        
+            plt.subplot(2, 1, 1)
+            plt.plot(np.arange(len(self.input_signal)) / fs, self.input_signal, label='Your Input Signal')
+            plt.title('Input Signal: Time Domain')
+            plt.xlabel('Time (s)')
+            plt.ylabel('Amplitude')
+            plt.legend()
+        
+            plt.subplot(2, 1, 2)
+            freqs, mags = _mag_db(self.input_signal, fs)
+            plt.plot(freqs, mags)
+            plt.title('Input Signal: Frequency Domain')
+            plt.xlabel('Frequency (Hz)')
+            plt.ylabel('Magnitude (dB)')
+        
+            plt.tight_layout()
+        
+        return
+        
+    def calculate_centers(self, base_frequency, num_bands):
+    
+        # Calculate the frequencies and frequency edges based upon the octave frequency and number of bands desired.
+        # Each edge is the geometric mean of its neighbouring centers, which is
+        # identical to the midpoint between them on a log10 axis
+        frequencies = (base_frequency * np.power(2.0, np.arange(-1, num_bands))).tolist()
+        edges = np.sqrt(np.asarray(frequencies[:-1]) * np.asarray(frequencies[1:])).tolist()
+
+        # Print out the obtained frequency bands
+        print(f"\nOctaves [Hz]\t\tEdge Frequencies [Hz]\n")
+        for i, (freq, edge) in enumerate(zip(frequencies, edges)):
+            if i == 0:
+                print(f"Omitted band\n{freq:8.2f} [Hz]\t\t0\tand {edge:8.2f} [Hz]\n")
+                print(f"Bands used:")
+            else:
+                print(f"{freq:8.2f} [Hz]\t\t{edges[i-1]:.2f}\tand {edge:8.2f} [Hz]")
+        print(f"\n")
+        
+        self.frequencies = frequencies
+        self.edges = edges  
+        
+        return frequencies, edges
+        
+    def plot_bandpass_filter_response(self, scale='linear'):
+        if PLOT:
+            plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
+      
+        # Obtain the freq, resp, and sos from the Butterworth bandpass filter
+        for i in range(0, NUM_BANDS):
+            lowcut = self.edges[i]
+            highcut = self.edges[i + 1]
+
+            sos = self.butter_bandpass(lowcut, highcut, self.fs, i, order=NUMSTAGES)
+            self.sos_list.append(sos)
+
+            # float32 copy of the sections for the SciPy filtering path; the
+            # float64 originals are kept for the Q31 coefficient export
+            self.sos32_list.append(sos.astype(np.float32))
+
+            # Zeroed initial filter state, built once per band so sosfilt
+            # does not allocate state internally on every call
+            self.zi_list.append(np.zeros((sos.shape[0], 2), dtype=np.float32))
+            
+            # Scale the coefficients by the poststage factor and format to Q31.
+            # The CMSIS layout is filled in place in the reused scratch buffer
+            # instead of allocating hstack/reshape intermediates
+            self._coefs_buf[:, :3] = sos[:, :3]
+            np.negative(sos[:, 4:], out=self._coefs_buf[:, 3:])
+            coefs = self._coefs_buf.ravel()
+            coefsQ31 = coefs * Q31_COEF_SCALE
+            np.rint(coefsQ31, out=coefsQ31)
+            
+            print("")
+            print("~~~~~~~~~~ Scaled Q31 Biquad Coefficient bands: {:.1f} Hz to {:.1f} Hz: ~~~~~~~~~~ \n".format(lowcut, highcut))
+            print(" ".join("{:.2f}".format(x) for x in coefsQ31))
+            print("\n\n")
+             
+            if PLOT:
+                # Evaluate the frequency response directly on the sections,
+                # only when it is actually going to be drawn
+                freq, resp = sosfreqz(sos, fs=self.fs)
+                plt.plot(freq, np.abs(resp))
+                plt.title('Magnitude Response of Butterworth Bandpass Filter')
+                plt.xlabel('Frequency (Hz)')
+                plt.ylabel('Magnitude')
+
+        # Plot the signal in log if desired
+        if PLOT and LOG_SCALE_PLOT:
+            plt.semilogx(self.frequencies, np.ones_like(self.frequencies), 'o', label='Centres of the bandpass filters')
+            plt.semilogx(self.edges, np.ones_like(self.edges) * 1, '*', label='Edges of the bandpass filters')
+            plt.title('Logarithmic Scale Plot of Frequencies')
+            plt.gca().xaxis.set_major_formatter(ScalarFormatter())
+            plt.legend()
+            plt.grid(True)
+   
+        return
+            
+    def butter_bandpass(self, lowcut, highcut, fs, i, order):
+
+        # The design is a pure function of the band parameters, so it is
+        # delegated to the cached module-level helper; only the sos is
+        # returned since the response is computed lazily when plotting
+        return _design_bandpass(lowcut, highcut, fs, order)
+        
+    def apply_filters_and_print_python(self):
+
+        # Filter the signal using a digital IIR filter defined by sos.
+        # Scale the bands here, for example the first band scaled by a factor of 1.
+        # This is where the "equalization" portion would be applied to tune the bands
+        gains = np.ones(NUM_BANDS, dtype=np.float32)
+        gains[0] *= 1
+
+        if HAVE_CUSIGNAL and len(self.input_signal) > GPU_MIN_SAMPLES:
+            # Filter every band on the GPU and accumulate the gained outputs
+            # there, so only the final signal crosses back to the host
+            sig_dev = cp.asarray(self.input_signal, dtype=cp.float32)
+            final_dev = cp.zeros_like(sig_dev)
+            for i, sos in enumerate(self.sos_list):
+                final_dev += gains[i] * cusignal.sosfilt(cp.asarray(sos), sig_dev)
+            final_signal = cp.asnumpy(final_dev)
+        elif HAVE_NUMBA:
+            # Run the whole filter bank through the JIT'd cascade kernel,
+            # which sums the gained bands sample by sample in one pass
+            final_signal = sos_cascade(self.input_signal, np.stack(self.sos32_list), gains)
+        else:
+            # Stream the signal in cache-sized blocks: each hot block is pushed
+            # through every band before moving on, with the per-band filter
+            # state carried across blocks via zi, and the gained outputs
+            # accumulate straight into the result with no band buffers at all
+            final_signal = np.zeros(len(self.input_signal), dtype=np.float32)
+            zi = list(self.zi_list)
+            for start in range(0, len(self.input_signal), BLOCK_SIZE):
+                blk = self.input_signal[start:start + BLOCK_SIZE]
+                for i, sos in enumerate(self.sos32_list):
+                    y, zi[i] = sosfilt(sos, blk, zi=zi[i])
+                    final_signal[start:start + BLOCK_SIZE] += gains[i] * y
+
+        # Plot resulting signal
+        if PLOT:
+            plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
+        
+            plt.subplot(2, 1, 1)
+            plt.plot(np.arange(len(final_signal)) / self.fs, final_signal, label='SciPy Filtered Signal')
+            plt.title('Python SciPy: Time Domain for the Filtered Signal')
+            plt.xlabel('Time (s)')
+            plt.ylabel('Amplitude')
+            plt.legend()
+        
+            plt.subplot(2, 1, 2)
+            freqs, mags = _mag_db(final_signal, self.fs)
+            plt.plot(freqs, mags)
+            plt.title('Python SciPy: Frequency Domain for the Filtered Signal')
+            plt.xlabel('Frequency (Hz)')
+            plt.ylabel('Magnitude (dB)')
+        
+            plt.tight_layout()
+        
+        # Output the signal to a wav file off the critical path
+        output_filename = SCIPY_OUT_FILENAME
+        self._io_futures.append(self._io_pool.submit(sf.write, output_filename, final_signal, self.fs))
+
+        return
+        
+    def _filter_blocks(self, cascade, instance, sig, out_row, scale=None):
+
+        # Stream the signal through the CMSIS kernel in cache-sized blocks;
+        # the instance keeps the biquad state between calls, so the result
+        # is bit-identical to one monolithic call while each block stays hot
+        for start in range(0, len(sig), BLOCK_SIZE):
+            res = cascade(instance, sig[start:start + BLOCK_SIZE])
+            if scale is None:
+                out_row[start:start + BLOCK_SIZE] = res
+            else:
+                out_row[start:start + BLOCK_SIZE] = res * scale
+
+        return
+
+    def apply_filters_and_print_ARM(self):
+    
+        # Preallocate one row per band so no list-of-arrays copy is made
+        # when the bands are summed at the end
+        signal_ARM = np.empty((NUM_BANDS, len(self.input_signal)))
+
+        if ARM_KERNEL == "q31":
+            # Convert the signal to Q31 and scale it down for filtering; this
+            # does not depend on the band, so it is done once before the loop
+            sigQ31 = self.input_signal.astype(np.float64) * Q31_SIG_SCALE
+        elif ARM_KERNEL == "q15":
+            # 16-bit samples halve the memory traffic through the filter;
+            # the ~90 dB Q15 noise floor is ample for equalizer use
+            sigQ15 = self.input_signal.astype(np.float64) * Q15_SIG_SCALE
+        else:
+            # The float kernel takes the signal as-is, no headroom scaling
+            sigF32 = np.ascontiguousarray(self.input_signal, dtype=np.float32)
+
+        # The biquad state is reused across bands; it only needs to be
+        # zeroed between them, not reallocated
+        state = np.zeros(NUMSTAGES * 4, dtype=np.float32 if ARM_KERNEL == "f32" else np.float64)
+
+         # Loop over the number of number of frequency bands
+        for i in range(0, NUM_BANDS):
+            sos = self.sos_list[i]
+            state.fill(0)
+
+            # Fill the (b0, b1, b2, -a1, -a2) layout CMSIS expects in place
+            # in the reused scratch buffer
+            self._coefs_buf[:, :3] = sos[:, :3]
+            np.negative(sos[:, 4:], out=self._coefs_buf[:, 3:])
+            coefs = self._coefs_buf.ravel()
+
+            if ARM_KERNEL == "q31":
+                # Scale down by the postshift and convert to Q31 in one fused
+                # multiply, rounding in place with the rint ufunc
+                coefsQ31 = coefs * Q31_COEF_SCALE
+                np.rint(coefsQ31, out=coefsQ31)
+
+                # Initialize the biquad filter and apply the filter
+                biquadQ31 = dsp.arm_biquad_casd_df1_inst_q31()
+                dsp.arm_biquad_cascade_df1_init_q31(biquadQ31, NUMSTAGES, coefsQ31, state, POSTSHIFT)
+
+                # Apply the filter block by block (the instance carries the
+                # biquad state across calls), rescaling into this band's row
+                self._filter_blocks(dsp.arm_biquad_cascade_df1_q31, biquadQ31,
+                                    sigQ31, signal_ARM[i], 4 / (1 << 31))
+            elif ARM_KERNEL == "q15":
+                # The raw low-band numerators underflow Q15 to zero (band 0
+                # has b0 ~ 2.6e-6), but normalizing each stage to peak 1
+                # removes the attenuation that keeps the near-unit-circle
+                # pole resonances bounded and overflows the non-saturating
+                # fast_q15 accumulator. Instead give every stage an equal
+                # prod(b_peak)**(1/NUMSTAGES) share of the numerator gain:
+                # each stage's passband gain stays near 1, intermediates stay
+                # in range, and the product of the rescalings is exactly 1 so
+                # the transfer function is unchanged with nothing to fold back
+                b_peak = np.abs(sos[:, :3]).max(axis=1)
+                stage_scale = np.prod(b_peak) ** (1.0 / NUMSTAGES) / b_peak
+                self._coefs_buf[:, :3] *= stage_scale[:, None]
+
+                # Q15 stages take 6 coefficients with a zero after b0:
+                # (b0, 0, b1, b2, -a1, -a2)
+                coefsQ15 = coefs * Q15_COEF_SCALE
+                np.rint(coefsQ15, out=coefsQ15)
+                coefsQ15 = np.insert(coefsQ15.reshape(NUMSTAGES, 5), 1, 0, axis=1).ravel()
+
+                # Initialize the biquad filter and apply the fast Q15 variant
+                biquadQ15 = dsp.arm_biquad_casd_df1_inst_q15()
+                dsp.arm_biquad_cascade_df1_init_q15(biquadQ15, NUMSTAGES, coefsQ15, state, POSTSHIFT)
+                self._filter_blocks(dsp.arm_biquad_cascade_df1_fast_q15, biquadQ15,
+                                    sigQ15, signal_ARM[i], 4 / (1 << 15))
+
+                # The narrowest bands sit at the edge of what Q15 can
+                # represent at this sample rate, so check each band against
+                # the float reference and complain loudly rather than ship a
+                # silently wrong wav
+                ref = sosfilt(sos, self.input_signal.astype(np.float64))
+                err = np.sqrt(np.mean((signal_ARM[i] - ref) ** 2))
+                if err > 0.05 * np.sqrt(np.mean(ref ** 2)):
+                    print("WARNING: band {:d} ({:.1f} Hz to {:.1f} Hz) is not accurately "
+                          "representable with the Q15 kernel (RMS error {:.3g}); "
+                          "use ARM_KERNEL = \"q31\" or \"f32\" for this band layout".format(
+                              i, self.edges[i], self.edges[i + 1], err))
+            else:
+                # Float DF1 kernel: the coefficients are used directly, so all
+                # of the Q31 quantization and rescaling math is skipped
+                biquadF32 = dsp.arm_biquad_casd_df1_inst_f32()
+                dsp.arm_biquad_cascade_df1_init_f32(biquadF32, NUMSTAGES, coefs.astype(np.float32), state)
+                self._filter_blocks(dsp.arm_biquad_cascade_df1_f32, biquadF32,
+                                    sigF32, signal_ARM[i])
+
+        # Scale the bands here, for example the first band scaled by a factor of 1.
+        # This is where the "equalization" portion would be applied to tune the bands
+        signal_ARM[0] *= 1
+
+        # Sum up all the signals together to reconstruction the original signal
+        final_signal_ARM = signal_ARM.sum(axis=0)
+
+        # Output the file name, writing off the critical path
+        output_filename = ARM_OUT_FILENAME
+        self._io_futures.append(self._io_pool.submit(sf.write, output_filename, final_signal_ARM, self.fs))
+
+        # Plot resulting signal
+        if PLOT:
+            plt.figure(figsize=(FIG_WIDTH, FIG_HEIGHT))
+        
+            plt.subplot(2, 1, 1)
+            plt.plot(np.arange(len(final_signal_ARM)) / self.fs, final_signal_ARM, label='ARM Filtered Signal')
+            plt.title('ARM: Time Domain for the Filtered Signal')
+            plt.xlabel('Time (s)')
+            plt.ylabel('Amplitude')
+            plt.legend()
+        
+            plt.subplot(2, 1, 2)
+            freqs, mags = _mag_db(final_signal_ARM, self.fs)
+            plt.plot(freqs, mags)
+            plt.title('ARM: Frequency Domain for the Filtered Signal')
+            plt.xlabel('Frequency (Hz)')
+            plt.ylabel('Magnitude (dB)')
+        
+            plt.tight_layout()
+        
+        return
+        
+if __name__ == "__main__":
+
+    # ~~~~~~~~~~ Signal Generation ~~~~~~~~~~~~~
+
+    if GENERATE_SIGNAL:
+        processor = SignalProcessor()
+        processor.generate_input_signal()
+    else:
+        processor = SignalProcessor()
+        processor.load_input_signal(filename=INPUT_FILENAME)   
+       
+    # ~~~~~~~~~~ Filter Generation ~~~~~~~~~~~~~
+
+    processor.calculate_centers(BASE_FREQUENCY, NUM_BANDS+1)
+    processor.plot_bandpass_filter_response()
+       
+    # ~~~~~~~ Python Filter Application ~~~~~~~~
+
+    processor.apply_filters_and_print_python()
+
+    # ~~~~~~~~~ ARM Filter Application ~~~~~~~~~
+
+    processor.apply_filters_and_print_ARM()
+
+    # ~~~~~~~~~~~~ Show the plots ~~~~~~~~~~~~~~
+
+    if PLOT:
+        plt.show()
+
+    # Wait for any wav writes still in flight before exiting; result()
+    # re-raises any write failure instead of swallowing it
+    for future in processor._io_futures:
+        future.result()
+    processor._io_pool.shutdown(wait=True)